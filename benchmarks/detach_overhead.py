@@ -0,0 +1,55 @@
+"""
+Check that a service with pybreak installed pays nothing for it while
+the debugger isn't attached. Times a workload with no hook installed,
+interleaved with runs where the hook is installed and the debugger has
+been attached and detached again, and fails if the detached runs are
+more than TOLERANCE slower.
+
+    PYTHONPATH=. python benchmarks/detach_overhead.py
+"""
+import os
+import signal
+import sys
+import timeit
+
+from pybreak import pybreak
+
+ROUNDS = 10
+NUMBER = 100
+TOLERANCE = 0.10
+
+
+def workload():
+    total = 0
+    for i in range(10_000):
+        total += i * i
+    return total
+
+
+def attach_and_detach():
+    pybreak.attach_on_signal(signal.SIGUSR2)
+    pybreak.pb.load_commands(["detach"])
+    os.kill(os.getpid(), signal.SIGUSR2)
+    # The handler attaches us, and the next line runs the detach command
+    assert sys.gettrace() is None, "pybreak should have detached"
+    assert not pybreak.pb.frame_history.history, "detach should free the history"
+
+
+def main():
+    baseline, detached = [], []
+    for _ in range(ROUNDS):
+        signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+        baseline.append(timeit.timeit(workload, number=NUMBER))
+
+        attach_and_detach()
+        detached.append(timeit.timeit(workload, number=NUMBER))
+        assert sys.gettrace() is None, "tracing came back after detaching"
+
+    ratio = min(detached) / min(baseline)
+    print(f"no hook:      {min(baseline):.4f}s (best of {ROUNDS})")
+    print(f"after detach: {min(detached):.4f}s (best of {ROUNDS}, {ratio:.2f}x)")
+    assert ratio <= 1 + TOLERANCE, f"detached runs were {ratio:.2f}x slower than baseline"
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,9 @@ import difflib
 import pprint
 import shlex
 import textwrap
+import types
 from enum import auto, Enum
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 
 import sys
 from pygments.styles import get_style_by_name
@@ -47,6 +48,13 @@ class Command:
     ):
         raise NotImplementedError("Command.run must be implemented by subclasses.")
 
+    def resume(self, debugger: bdb.Bdb, frame: types.FrameType):
+        """
+        Set the debugger up to run until the next stop, as this
+        command does. Used to repeat a command without prompting.
+        """
+        raise NotImplementedError(f"{self.alias_list[0]} cannot be repeated.")
+
     @classmethod
     def from_raw_input(cls, input) -> Tuple["Command", Tuple[Any]]:
         parts = shlex.split(input)
@@ -62,6 +70,24 @@ class Command:
                 f"{self.alias_list[0]} takes {self.arity} argument{'s' if self.arity != 1 else ''}, not {len(called_with)}."
             )
 
+    def parse_int_arg(self, called_with: Tuple[Any], default: int, minimum: Optional[int] = None) -> int:
+        """
+        Parse an optional integer argument, e.g. the repeat
+        count in `n 100`. Falls back to the default if it's
+        missing, isn't a number, or is less than the minimum.
+        """
+        if not called_with:
+            return default
+        try:
+            value = int(called_with[0])
+        except ValueError:
+            log(f"{self.alias_list[0]} expects a number, not {called_with[0]!r}.")
+            return default
+        if minimum is not None and value < minimum:
+            log(f"{self.alias_list[0]} expects a number of at least {minimum}, not {value}.")
+            return default
+        return value
+
 
 class PrintNearbyCode(Command):
     """
@@ -143,8 +169,8 @@ class DiffVariable(Command):
 
         # Lets ensure that we're in the same frame
         if hist_frame.raw_frame is exec_frame.raw_frame:
-            hist_repr = pprint.pformat(hist_frame.frame_locals.get(var_name)).split('\n')
-            exec_repr = pprint.pformat(exec_frame.frame_locals.get(var_name)).split('\n')
+            hist_repr = pprint.pformat(hist_frame.get_local(var_name)).split('\n')
+            exec_repr = pprint.pformat(exec_frame.get_local(var_name)).split('\n')
             differ = difflib.Differ()
             diff = differ.compare(hist_repr, exec_repr)
             colour_diff = []
@@ -182,13 +208,36 @@ class HistoryOfVariable(Command):
 
 class NextLine(Command):
     """
-    Continue execution until the next line.
+    Continue execution until the next line. Takes an optional
+    count, e.g. `n 100`, to move forward that many lines at once.
     """
 
     alias_list = ("n", "next")
     after = After.Proceed
 
     def run(self, debugger, frame, *args):
+        debugger.steps_remaining = self.parse_int_arg(args, default=1, minimum=1) - 1
+        self.resume(debugger, frame.raw_frame)
+        debugger.prev_command = self
+
+    def resume(self, debugger, frame):
+        debugger.set_next(frame)
+
+
+class Until(Command):
+    """
+    Continue execution until a line greater than or equal to
+    the given one is reached in the current frame, or the current
+    frame returns. Without an argument, run until a line greater
+    than the current one, which is handy for getting out of loops.
+    """
+
+    alias_list = ("unt", "until")
+    after = After.Proceed
+
+    def run(self, debugger, frame, *args):
+        line_no = self.parse_int_arg(args, default=frame.lineno + 1)
+        debugger.until = (frame.raw_frame, line_no)
         debugger.set_next(frame.raw_frame)
         debugger.prev_command = self
 
@@ -238,6 +287,21 @@ class Quit(Command):
         debugger.quitting = True
 
 
+class Detach(Command):
+    """
+    Stop debugging and let the program carry on at full speed.
+    Tracing is removed and the history discarded, until the
+    debugger is attached again.
+    """
+
+    alias_list = ("detach",)
+    after = After.Proceed
+
+    def run(self, debugger, frame, *args):
+        debugger.detach()
+        debugger.prev_command = self
+
+
 class NextReturn(Command):
     """
     Continue execution until the current function returns.
@@ -255,11 +319,15 @@ class Step(Command):
     """
     Execute the current line, but stop at the earliest possible
     moment. This could be in a function called on the current line,
-    or perhaps on the next line.
+    or perhaps on the next line. Takes an optional count, e.g. `s 10`.
     """
     after = After.Proceed
     alias_list = ("s", "step")
 
     def run(self, debugger, frame, *args):
-        debugger.set_step()
+        debugger.steps_remaining = self.parse_int_arg(args, default=1, minimum=1) - 1
+        self.resume(debugger, frame.raw_frame)
         debugger.prev_command = self
+
+    def resume(self, debugger, frame):
+        debugger.set_step()
@@ -1,10 +1,10 @@
 import types
-from copy import deepcopy
 from typing import Dict, Optional, List
 
 from dataclasses import dataclass, field
 
 from pybreak.frame_state import FrameState
+from pybreak.snapshot import SnapshotSerializer
 
 FrameUUID = str
 
@@ -20,6 +20,7 @@ class FrameHistory:
     history: Dict[FrameUUID, FrameState] = field(default_factory=dict)
     location: Optional[FrameUUID] = None
     hist_index: int = 1  # indicates where we are in history
+    serializer: SnapshotSerializer = field(default_factory=SnapshotSerializer)
 
     def append(self, frame: types.FrameType):
         """
@@ -28,13 +29,10 @@ class FrameHistory:
         history, we implicitly update the current location
         to indicate where we're at in execution.
         """
-        try:
-            locals = deepcopy(frame.f_locals)
-        except TypeError:
-            locals = frame.f_locals
         frame_state = FrameState(
             frame,
-            locals,
+            self.serializer.dumps(frame.f_locals),
+            self.serializer,
             entry_num=len(self.history)
         )
         self.location = frame_state.uuid  # always refers to latest EXECUTED frame. nothing to do with history...
@@ -6,6 +6,8 @@ from typing import Dict, Any
 
 from dataclasses import dataclass
 
+from pybreak.snapshot import Snapshot, SnapshotSerializer
+
 
 def frame_uuid():
     return uuid.uuid4().hex
@@ -13,14 +15,28 @@ def frame_uuid():
 
 @dataclass
 class FrameState:
-    def __init__(self, frame: types.FrameType, frame_locals: Dict[str, Any], entry_num: int):
+    def __init__(self, frame: types.FrameType, snapshot: Snapshot, serializer: SnapshotSerializer, entry_num: int):
         self.raw_frame = frame
         self.frame_info: inspect.Traceback = inspect.getframeinfo(frame)
-        self.frame_locals: Dict[str, Any] = frame_locals
+        self.snapshot = snapshot
+        self.serializer = serializer
         self.uuid: str = frame_uuid()
         self.exec_time: datetime.datetime = datetime.datetime.now()
         self.entry_num = entry_num
 
+    @property
+    def frame_locals(self) -> Dict[str, Any]:
+        """
+        A fresh copy of the locals as they were when this frame
+        state was captured, unpickled from the snapshot.
+        """
+        return self.serializer.loads(self.snapshot)
+
+    def get_local(self, name: str, default: Any = None) -> Any:
+        if name not in self.snapshot.names:
+            return default
+        return self.serializer.load_value(self.snapshot, name)
+
     @property
     def uuid_short(self):
         return uuid[:6]
@@ -1,11 +1,14 @@
 import inspect
 import pprint
+import signal
 import sys
 import textwrap
 import traceback
 import types
 from bdb import Bdb
+from collections import deque
 from pathlib import Path
+from typing import Deque, Iterable, Optional, Tuple
 
 import pygments
 from pygments.lexers.python import PythonLexer
@@ -22,6 +25,7 @@ from prompt_toolkit.styles import Style, style_from_pygments_cls, merge_styles
 from pybreak import __version__
 from pybreak.command import Command, After, Quit, PrintNearbyCode
 from pybreak.frame_history import FrameHistory
+from pybreak.snapshot import ReprSummary
 from pybreak.utility import get_terminal_size
 
 styles = Style.from_dict({"rprompt": "gray"})
@@ -44,6 +48,12 @@ class Pybreak(Bdb):
         self.frame_history = FrameHistory()
         self.eval_count: int = 0
         self.prev_command = None
+        # Batched stepping: stops left to make before prompting again,
+        # and the (frame, line) that `until` is running towards.
+        self.steps_remaining: int = 0
+        self.until: Optional[Tuple[types.FrameType, int]] = None
+        # Commands read from a script rather than the prompt, if any.
+        self.command_script: Optional[Deque[str]] = None
 
         bindings = KeyBindings()
 
@@ -95,12 +105,12 @@ class Pybreak(Bdb):
         )
 
     def repeatedly_prompt(self):
-        if self.prev_command and self.prev_command.after == After.Proceed:
+        if self.prev_command and self.prev_command.after == After.Proceed and not self.command_script:
             PrintNearbyCode().run(self, self.frame_history.exec_frame)
         while True:
             self.num_prompts += 1
             try:
-                input = self.session.prompt()
+                input = self._read_input()
                 if not input:
                     continue
             except KeyboardInterrupt:
@@ -115,12 +125,83 @@ class Pybreak(Bdb):
                 # to a standard command. Evaluate it.
                 self._eval_and_print_result(input)
             else:
+                # Only the batch commands themselves start a new batch
+                self._cancel_batch()
                 cmd.run(self, self.frame_history.exec_frame, *args)
                 if cmd.after == After.Proceed:
                     break
                 elif cmd.after == After.Stay:
                     continue
 
+    def _read_input(self) -> str:
+        """
+        Read the next command, either from the command script
+        or from the user. Once a script runs out of commands,
+        execution continues to the end without prompting.
+        """
+        if self.command_script is None:
+            return self.session.prompt()
+        if self.command_script:
+            return self.command_script.popleft()
+        self.command_script = None
+        return "continue"
+
+    def _resume_batch(self, frame: types.FrameType) -> bool:
+        """
+        If the previous command asked to make more than one stop
+        (e.g. `n 100` or `until 42`), set up the next one and return
+        True, so that we carry on without prompting. The frame has
+        already been recorded in the history by this point.
+        """
+        if self.until:
+            until_frame, line_no = self.until
+            if frame is until_frame and frame.f_lineno < line_no:
+                self.set_next(frame)
+                return True
+            self.until = None
+            return False
+        if self.steps_remaining > 0:
+            self.steps_remaining -= 1
+            self.prev_command.resume(self, frame)
+            return True
+        return False
+
+    def reset(self):
+        super().reset()
+        # Don't let a batch left over from an earlier session carry on
+        self._cancel_batch()
+        self.prev_command = None
+
+    def _cancel_batch(self):
+        self.steps_remaining = 0
+        self.until = None
+
+    def load_commands(self, commands: Iterable[str]):
+        """
+        Run the given commands in order instead of prompting
+        for them. Blank lines and lines starting with # are ignored.
+        """
+        self.command_script = deque(
+            line.strip() for line in commands
+            if line.strip() and not line.strip().startswith("#")
+        )
+
+    def run_script(self, file_name: str):
+        """
+        Debug the Python script at the given path, as though
+        it were run as __main__, stopping on its first line.
+        """
+        import __main__
+        __main__.__dict__.clear()
+        __main__.__dict__.update({
+            "__name__": "__main__",
+            "__file__": file_name,
+            "__builtins__": __builtins__,
+        })
+        with open(file_name, "rb") as f:
+            code = compile(f.read(), file_name, "exec")
+        self.run(code, __main__.__dict__)
+
     def _quit(self):
         sys.settrace(None)
         self.quitting = True
@@ -128,7 +209,8 @@ class Pybreak(Bdb):
     def user_call(self, frame: types.FrameType, argument_list):
         if self.stop_here(frame):
             self.frame_history.append(frame)
-            self.repeatedly_prompt()
+            if not self._resume_batch(frame):
+                self.repeatedly_prompt()
 
     def user_line(self, frame: types.FrameType):
         """
@@ -143,6 +225,8 @@ class Pybreak(Bdb):
         """
         if self.stop_here(frame):
             self.frame_history.append(frame)
+            if self._resume_batch(frame):
+                return
             # TODO: Only capture output if continuation command ran
             self.repeatedly_prompt()
 
@@ -151,8 +235,31 @@ class Pybreak(Bdb):
         if self.num_prompts < 1:
             print_formatted_text(HTML('_' * num_cols))
             print_formatted_text(HTML(f"<b>Pybreak {__version__}</b>\n"))
+        # A script that ran out without another stop is finished with
+        if not self.command_script:
+            self.command_script = None
         super().set_trace(frame)
 
+    def detach(self):
+        """
+        Remove all tracing and let the program run at full speed.
+        The frame history is discarded, so it can be freed.
+        """
+        self.clear_all_breaks()
+        self._cancel_batch()
+        self.command_script = None
+        # With no breakpoints, this removes the trace function entirely
+        self.set_continue()
+        self.frame_history = FrameHistory()
+
+    @property
+    def attached(self) -> bool:
+        """
+        Whether we're tracing the current thread. `continue` and `quit`
+        can remove tracing too, so we ask sys rather than keep a flag.
+        """
+        return sys.gettrace() == self.trace_dispatch
+
     def do_clear(self, arg):
         self.clear_all_breaks()
 
@@ -195,10 +302,23 @@ class Pybreak(Bdb):
         )
 
     def _eval_and_print_result(self, input: str):
+        if self.frame_history.viewing_history:
+            # Evaluate against the locals as they were at that point in
+            # history. Leave out the ones we couldn't capture, so that
+            # names like imported modules come from the frame's globals.
+            frame = self.frame_history.hist_frame
+            frame_locals = {
+                name: value
+                for name, value in frame.frame_locals.items()
+                if not isinstance(value, ReprSummary)
+            }
+        else:
+            frame = self.frame_history.exec_frame
+            frame_locals = frame.raw_frame.f_locals
         try:
-            output = pprint.pformat(self.runeval(
-                input, self.frame_history.exec_frame.raw_frame.f_globals, self.frame_history.exec_frame.frame_locals
-            ))
+            # Plain eval rather than runeval, which would reset
+            # the debugger and remove the trace function after.
+            output = pprint.pformat(eval(input, frame.raw_frame.f_globals, frame_locals))
             tokens = pygments.lex(output, lexer=PythonLexer())
             print_formatted_text(PygmentsTokens(tokens))
         except Exception as err:
@@ -222,3 +342,20 @@ pb = Pybreak()
 def set_trace():
     frame = inspect.currentframe().f_back
     pb.start(frame)
+
+
+def attach_on_signal(signum: Optional[int] = None):
+    """
+    Install a signal handler that starts debugging the main thread
+    wherever it happens to be when the signal arrives. Defaults to
+    SIGUSR2. Until then, and after a `detach`, there's no tracing
+    overhead at all.
+    """
+    if signum is None:
+        signum = signal.SIGUSR2
+
+    def handler(received, frame):
+        if not pb.attached:
+            pb.start(frame)
+
+    signal.signal(signum, handler)
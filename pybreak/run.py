@@ -0,0 +1,33 @@
+import argparse
+import os
+import sys
+
+from pybreak.pybreak import pb
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        prog="pybreak",
+        description="Debug a Python script with pybreak.",
+    )
+    parser.add_argument(
+        "--commands",
+        metavar="FILE",
+        help="Run the debugger commands in FILE, one per line, instead of prompting.",
+    )
+    parser.add_argument("script", help="The script to debug.")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments passed to the script.")
+    options = parser.parse_args()
+
+    if options.commands:
+        with open(options.commands) as f:
+            pb.load_commands(f)
+
+    # Make the script behave as though it was run directly
+    sys.argv = [options.script, *options.args]
+    sys.path[0] = os.path.dirname(os.path.abspath(options.script))
+    pb.run_script(options.script)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,277 @@
+import hashlib
+import io
+import pickle
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from dataclasses import dataclass, field
+
+# Out-of-band buffers need pickle protocol 5 (Python 3.8+). On older
+# Pythons, buffers that pickle doesn't know how to share are pickled
+# in-band, which still works, just with more copying.
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+OUT_OF_BAND = PROTOCOL >= 5
+
+# Buffers smaller than this are cheaper to copy into a snapshot than to hash.
+MIN_SHARED_BUFFER_SIZE = 1024
+
+BufferHash = str
+
+
+@dataclass
+class ReprSummary:
+    """
+    Stands in for a value that couldn't be pickled, so that
+    we don't end up holding a reference to the live object.
+    """
+    type_name: str
+    text: str
+
+    def __repr__(self):
+        return f"<{self.type_name} (not captured): {self.text}>"
+
+
+@dataclass
+class PickledValue:
+    data: bytes
+    # Out-of-band buffers and whether they were read-only,
+    # in the order the unpickler expects them
+    buffers: Tuple[Tuple[BufferHash, bool], ...] = ()
+    # Every buffer this value refers to, including the out-of-band ones
+    refs: Tuple[BufferHash, ...] = ()
+
+
+@dataclass
+class Snapshot:
+    """
+    The pickled locals of a frame at a point in time. Large
+    buffers aren't stored inline, they're referenced by hash
+    in the BufferStore the snapshot was taken with.
+    """
+    names: Tuple[str, ...] = ()
+    # All the locals pickled together, which keeps references between them...
+    all_values: Optional[PickledValue] = None
+    # ...or if some couldn't be pickled, each of them pickled separately
+    values: Dict[str, Union[PickledValue, ReprSummary]] = field(default_factory=dict)
+
+    @property
+    def buffer_refs(self) -> Tuple[BufferHash, ...]:
+        pickled = [self.all_values] if self.all_values else list(self.values.values())
+        return tuple({
+            ref: None
+            for value in pickled
+            if isinstance(value, PickledValue)
+            for ref in value.refs
+        })
+
+
+@dataclass
+class BufferStore:
+    """
+    Content-addressed storage for buffers shared between snapshots.
+    A buffer that doesn't change between steps is only stored once.
+    """
+    buffers: Dict[BufferHash, bytes] = field(default_factory=dict)
+
+    def add(self, data: Union[bytes, bytearray, memoryview]) -> BufferHash:
+        view = memoryview(data)
+        if not view.c_contiguous:
+            view = memoryview(view.tobytes())
+        view = view.cast("B")
+        digest = hashlib.blake2b(view, digest_size=16).hexdigest()
+        if digest not in self.buffers:
+            # bytes are immutable, so we can share them rather than copy
+            self.buffers[digest] = data if type(data) is bytes else view.tobytes()
+        return digest
+
+    def __getitem__(self, digest: BufferHash) -> bytes:
+        return self.buffers[digest]
+
+    def __contains__(self, digest: BufferHash) -> bool:
+        return digest in self.buffers
+
+    def __len__(self):
+        return len(self.buffers)
+
+
+class _SnapshotPickler(pickle.Pickler):
+    def __init__(self, file, store: BufferStore):
+        if OUT_OF_BAND:
+            super().__init__(file, protocol=PROTOCOL, buffer_callback=self._buffer_callback)
+        else:
+            super().__init__(file, protocol=PROTOCOL)
+        self.store = store
+        self.buffers: List[Tuple[BufferHash, bool]] = []
+        self.refs: List[BufferHash] = []
+        # Pickle checks persistent_id before its memo, so we have to
+        # remember which buffers we've already seen ourselves. Keeping
+        # the objects alive stops their ids being reused mid-dump.
+        self.pids: Dict[int, Tuple[Any, tuple]] = {}
+        # Ids of the small buffers we've copied into pids, which
+        # the pickler will offer to persistent_id in turn.
+        self.inline: Set[int] = set()
+
+    def persistent_id(self, obj):
+        # bytes are always pickled in-band and memoryviews can't be
+        # pickled at all, so we share the builtin buffer types ourselves.
+        obj_type = type(obj)
+        if obj_type not in (bytes, bytearray, memoryview) or id(obj) in self.inline:
+            return None
+        if id(obj) in self.pids:
+            return self.pids[id(obj)][1]
+        if obj_type is memoryview:
+            pid = self._memoryview_id(obj)
+        else:
+            pid = (obj_type.__name__, len(self.pids), *self._buffer_source(obj))
+        self.pids[id(obj)] = obj, pid
+        return pid
+
+    def _buffer_source(self, data: Union[bytes, bytearray, memoryview]) -> Tuple[Optional[BufferHash], Optional[bytes]]:
+        """
+        Large buffers are stored by hash, small ones inline in the pid.
+        """
+        if memoryview(data).nbytes < MIN_SHARED_BUFFER_SIZE:
+            inline = memoryview(data).tobytes()
+            self.inline.add(id(inline))
+            return None, inline
+        digest = self.store.add(data)
+        self.refs.append(digest)
+        return digest, None
+
+    def _memoryview_id(self, view: memoryview):
+        flat = view if view.c_contiguous else memoryview(view.tobytes())
+        try:
+            # Make sure we'll be able to rebuild the view when loading
+            flat.cast("B").cast(view.format, view.shape)
+        except (TypeError, ValueError) as err:
+            raise pickle.PicklingError(f"Can't capture memoryview with format {view.format!r}") from err
+        index = len(self.pids)
+        if type(view.obj) in (bytes, bytearray) and view.c_contiguous and view.nbytes == len(view.obj):
+            # A view over the whole of a bytes or bytearray is rebuilt
+            # over the same object, so changes to one show in the other.
+            base = self.persistent_id(view.obj)
+            return "memoryview", index, base, view.format, view.shape, view.readonly
+        digest, data = self._buffer_source(view)
+        base = ("bytes" if view.readonly else "bytearray", None, digest, data)
+        return "memoryview", index, base, view.format, view.shape, view.readonly
+
+    def _buffer_callback(self, buffer: "pickle.PickleBuffer") -> bool:
+        raw = buffer.raw()
+        if raw.nbytes < MIN_SHARED_BUFFER_SIZE:
+            return True  # Pickle it in-band
+        digest = self.store.add(raw)
+        self.buffers.append((digest, raw.readonly))
+        self.refs.append(digest)
+        return False
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file, store: BufferStore, **kwargs):
+        super().__init__(file, **kwargs)
+        self.store = store
+        self.loaded: Dict[int, Any] = {}
+
+    def persistent_load(self, pid):
+        kind, index, *info = pid
+        if index in self.loaded:
+            return self.loaded[index]
+        if kind == "memoryview":
+            base, buffer_format, shape, readonly = info
+            view = memoryview(self.persistent_load(base)).cast("B").cast(buffer_format, shape)
+            obj = view.toreadonly() if readonly and not view.readonly else view
+        else:
+            digest, data = info
+            if digest is not None:
+                data = self.store[digest]
+            obj = bytearray(data) if kind == "bytearray" else data
+        if index is not None:
+            self.loaded[index] = obj
+        return obj
+
+
+@dataclass
+class SnapshotSerializer:
+    """
+    Serializes frame locals into Snapshots using pickle protocol 5,
+    with large buffers stored out-of-band in a shared BufferStore.
+    """
+    store: BufferStore = field(default_factory=BufferStore)
+
+    def dumps(self, frame_locals: Dict[str, Any]) -> Snapshot:
+        names = tuple(frame_locals)
+        try:
+            return Snapshot(names, all_values=self._pickle(dict(frame_locals)))
+        except Exception:
+            pass
+        # Something couldn't be pickled, so pickle each variable separately
+        # so that it doesn't stop us capturing the rest.
+        return Snapshot(names, values={
+            name: self._dump_value(value)
+            for name, value in frame_locals.items()
+        })
+
+    def loads(self, snapshot: Snapshot) -> Dict[str, Any]:
+        if snapshot.all_values:
+            return self._unpickle(snapshot.all_values)
+        return {
+            name: self._load(snapshot.values[name])
+            for name in snapshot.names
+        }
+
+    def load_value(self, snapshot: Snapshot, name: str) -> Any:
+        if snapshot.all_values:
+            return self.loads(snapshot)[name]
+        return self._load(snapshot.values[name])
+
+    def _load(self, value: Union[PickledValue, ReprSummary]) -> Any:
+        if isinstance(value, ReprSummary):
+            return value
+        return self._unpickle(value)
+
+    def _unpickle(self, value: PickledValue) -> Any:
+        if OUT_OF_BAND:
+            # Copy writable buffers, so they come back writable
+            buffers = [
+                self.store[ref] if readonly else bytearray(self.store[ref])
+                for ref, readonly in value.buffers
+            ]
+            unpickler = _SnapshotUnpickler(io.BytesIO(value.data), self.store, buffers=buffers)
+        else:
+            unpickler = _SnapshotUnpickler(io.BytesIO(value.data), self.store)
+        return unpickler.load()
+
+    def to_bytes(self, snapshot: Snapshot) -> bytes:
+        """
+        Serialize a snapshot along with the buffers it
+        references, e.g. for writing history to disk.
+        """
+        buffers = {ref: self.store[ref] for ref in snapshot.buffer_refs}
+        return pickle.dumps((snapshot, buffers), protocol=PROTOCOL)
+
+    def from_bytes(self, data: bytes) -> Snapshot:
+        """
+        Load a snapshot written by to_bytes, adding its
+        buffers to the store if we don't have them already.
+        """
+        snapshot, buffers = pickle.loads(data)
+        for ref, buffer in buffers.items():
+            self.store.buffers.setdefault(ref, buffer)
+        return snapshot
+
+    def _dump_value(self, value: Any) -> Union[PickledValue, ReprSummary]:
+        try:
+            return self._pickle(value)
+        except Exception:
+            return ReprSummary(type(value).__name__, _safe_repr(value))
+
+    def _pickle(self, value: Any) -> PickledValue:
+        file = io.BytesIO()
+        pickler = _SnapshotPickler(file, self.store)
+        pickler.dump(value)
+        return PickledValue(file.getvalue(), tuple(pickler.buffers), tuple(pickler.refs))
+
+
+def _safe_repr(value: Any) -> str:
+    try:
+        return repr(value)
+    except Exception:
+        return object.__repr__(value)
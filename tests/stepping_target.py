@@ -0,0 +1,9 @@
+def count_up(n):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+result = count_up(5)
+print(result)
@@ -0,0 +1,279 @@
+import array
+import ctypes
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from ward import fixture, test
+
+from pybreak.command import Command
+from pybreak.pybreak import Pybreak, attach_on_signal, pb
+from pybreak.snapshot import ReprSummary, SnapshotSerializer, MIN_SHARED_BUFFER_SIZE
+
+TARGET = Path(__file__).parent / "stepping_target.py"
+MODULE_TARGET = Path(__file__).parent / "module_target.py"
+
+
+class RecordingPybreak(Pybreak):
+    """
+    Records the line numbers we prompted at, so we can tell
+    batched stops apart from prompted ones, and any errors
+    from evaluating expressions.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.prompted_at = []
+        self.errors = []
+
+    def repeatedly_prompt(self):
+        self.prompted_at.append(self.frame_history.exec_frame.lineno)
+        super().repeatedly_prompt()
+
+    def _print_exception(self, err):
+        self.errors.append(err)
+        super()._print_exception(err)
+
+
+@fixture
+def debugger():
+    return RecordingPybreak()
+
+
+def run_target(debugger, *commands, target=TARGET):
+    debugger.load_commands(commands)
+    code = compile(target.read_text(), str(target), "exec")
+    debugger.run(code, {"__name__": "__main__"})
+
+
+def history_lines(debugger):
+    return [frame.lineno for frame in debugger.frame_history.history.values()]
+
+
+@test("`n 2` records the same history as `n` twice, but only prompts at the end")
+def _(debugger=debugger):
+    run_target(debugger, "n 2")
+
+    assert debugger.prompted_at == [1, 9]
+    assert history_lines(debugger) == [1, 8, 9]
+
+
+@test("`s 4` steps into functions, prompting only at the end")
+def _(debugger=debugger):
+    run_target(debugger, "s 4")
+
+    assert debugger.prompted_at == [1, 3]
+    assert history_lines(debugger) == [1, 8, 1, 2, 3]
+
+
+for count in ("0", "-5", "abc"):
+
+    @test(f"`n {count}` falls back to a single step")
+    def _(debugger=debugger, count=count):
+        run_target(debugger, f"n {count}", "c")
+
+        assert debugger.prompted_at == [1, 8]
+        assert debugger.steps_remaining == 0
+
+
+@test("`until` with no argument runs to the end of a loop, recording each iteration")
+def _(debugger=debugger):
+    run_target(debugger, "n", "s", "s", "s", "s", "until")
+
+    assert debugger.prompted_at == [1, 8, 1, 2, 3, 4, 5]
+    assert history_lines(debugger)[6:] == [3, 4] * 4 + [3, 5]
+
+
+@test("`until 5` runs to the given line")
+def _(debugger=debugger):
+    run_target(debugger, "n", "s", "s", "until 5")
+
+    assert debugger.prompted_at == [1, 8, 1, 2, 5]
+
+
+@test("`unt` is short for `until`, leaving `u` free for moving up the stack like pdb")
+def _(debugger=debugger):
+    run_target(debugger, "n", "s", "s", "unt 5")
+
+    assert debugger.prompted_at == [1, 8, 1, 2, 5]
+    assert "u" not in Command.all
+
+
+@test("a batch that runs off the end doesn't carry over to the next session")
+def _(debugger=debugger):
+    run_target(debugger, "n 100")
+    assert debugger.steps_remaining > 0
+
+    debugger.load_commands(["detach"])
+    debugger.prompted_at.clear()
+    debugger.start(sys._getframe())
+    # We should be prompted here, and detach, rather than step silently on
+    assert debugger.prompted_at != []
+    assert debugger.steps_remaining == 0
+    assert sys.gettrace() is None
+
+
+@test("the command script is dropped once it runs out")
+def _(debugger=debugger):
+    run_target(debugger, "n")
+
+    assert debugger.command_script is None
+
+
+@test("`pybreak --commands` runs the commands without prompting")
+def _():
+    commands = Path(__file__).parent / "stepping_commands.txt"
+    result = subprocess.run(
+        [sys.executable, "-m", "pybreak.run", "--commands", str(commands), str(TARGET)],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        cwd=Path(__file__).parent.parent,
+    )
+
+    assert result.returncode == 0
+    assert "10242" in result.stdout
+    assert result.stdout.rstrip().endswith("10")
+
+
+@fixture
+def serializer():
+    return SnapshotSerializer()
+
+
+BIG = MIN_SHARED_BUFFER_SIZE * 4
+
+for value in (
+    b"small",
+    b"x" * BIG,
+    bytearray(b"small"),
+    bytearray(b"x" * BIG),
+    memoryview(b"abc"),
+    memoryview(b"x" * BIG),
+    memoryview(bytearray(b"abc")),
+    memoryview(bytearray(BIG)),
+    memoryview(array.array("i", range(BIG))),
+    array.array("d", [1.5] * BIG),
+):
+
+    @test(f"snapshots round-trip a {type(value).__name__} of {len(value)} items")
+    def _(serializer=serializer, value=value):
+        loaded = serializer.loads(serializer.dumps({"value": value}))["value"]
+
+        assert type(loaded) is type(value)
+        assert loaded == value
+        if isinstance(value, memoryview):
+            assert (loaded.format, loaded.shape) == (value.format, value.shape)
+            assert loaded.readonly == value.readonly
+
+
+for data in (bytearray(BIG), b"x" * BIG):
+
+    @test(f"out-of-band buffers from a {type(data).__name__} keep their writability")
+    def _(serializer=serializer, data=data):
+        # A PickleBuffer is pickled out-of-band and loads as the buffer itself
+        loaded = serializer.loads(serializer.dumps({"value": pickle.PickleBuffer(data)}))["value"]
+
+        assert loaded == data
+        assert memoryview(loaded).readonly == memoryview(data).readonly
+
+
+@test("evaluating while viewing history finds names that couldn't be captured in globals")
+def _(debugger=debugger):
+    run_target(debugger, "n", "n", "b", "os.sep", "x", target=MODULE_TARGET)
+
+    assert debugger.errors == []
+    assert debugger.eval_count == 2
+
+
+@test("buffers that don't change between snapshots are only stored once")
+def _(serializer=serializer):
+    data = bytearray(BIG)
+    serializer.dumps({"data": data})
+    stored = len(serializer.store)
+
+    serializer.dumps({"data": data, "other": 1})
+    assert len(serializer.store) == stored
+
+    data[0] = 1
+    serializer.dumps({"data": data})
+    assert len(serializer.store) == stored + 1
+
+
+@test("snapshots keep references shared between locals")
+def _(serializer=serializer):
+    shared = [1, 2, 3]
+    small, large = bytearray(10), bytearray(MIN_SHARED_BUFFER_SIZE)
+    frame_locals = {
+        "a": shared, "b": shared,
+        "small": small, "small_again": small, "small_view": memoryview(small),
+        "large": large, "large_again": large, "large_view": memoryview(large),
+    }
+
+    loaded = serializer.loads(serializer.dumps(frame_locals))
+
+    assert loaded["a"] is loaded["b"]
+    assert loaded["small"] is loaded["small_again"]
+    assert loaded["small_view"].obj is loaded["small"]
+    assert loaded["large"] is loaded["large_again"]
+    assert loaded["large_view"].obj is loaded["large"]
+
+
+@test("locals that can't be pickled are stored as a ReprSummary")
+def _(serializer=serializer):
+    lock = threading.Lock()
+
+    loaded = serializer.loads(serializer.dumps({"lock": lock, "n": [1, 2]}))
+
+    assert loaded["n"] == [1, 2]
+    assert isinstance(loaded["lock"], ReprSummary)
+    assert loaded["lock"].type_name == "lock"
+    assert repr(lock) in repr(loaded["lock"])
+
+
+@test("memoryviews that can't be rebuilt are stored as a ReprSummary")
+def _(serializer=serializer):
+    class Point(ctypes.Structure):
+        _fields_ = [("x", ctypes.c_int), ("y", ctypes.c_int)]
+
+    view = memoryview((Point * 2)())
+
+    loaded = serializer.loads(serializer.dumps({"view": view}))["view"]
+
+    assert isinstance(loaded, ReprSummary)
+
+
+@test("to_bytes and from_bytes carry a snapshot and its buffers to a new serializer")
+def _(serializer=serializer):
+    data = b"x" * BIG
+    snapshot = serializer.dumps({"data": data, "n": 1})
+
+    other = SnapshotSerializer()
+    loaded = other.loads(other.from_bytes(serializer.to_bytes(snapshot)))
+
+    assert loaded == {"data": data, "n": 1}
+    assert len(other.store) == 1
+
+
+@test("the debugger can be attached again after `continue` removes tracing")
+def _():
+    attach_on_signal(signal.SIGUSR2)
+    try:
+        pb.load_commands(["c"])
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert sys.gettrace() is None
+        assert not pb.attached
+
+        prompts = pb.num_prompts
+        pb.load_commands(["detach"])
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert pb.num_prompts > prompts
+        assert sys.gettrace() is None
+        assert not pb.frame_history.history
+    finally:
+        signal.signal(signal.SIGUSR2, signal.SIG_DFL)